@@ -1,60 +1,162 @@
 import os
 import json
 import hashlib
-import uuid
+import hmac
 import time
+import random
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 
 from utils.generator import llm_generate_files
 from utils.github_tools import (
-    create_github_repo_and_push,
+    create_github_repo,
     enable_github_pages,
+    github_pages_url,
     make_mit_license,
+    push_files_batch,
 )
 
+
+def _json_bytes(obj, sort_keys=False):
+    """
+    Serialises obj to JSON bytes with orjson, falling back to the stdlib
+    encoder for values orjson rejects (e.g. integers wider than 64 bits).
+    """
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    except TypeError:
+        return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that serialises jsonify() responses with orjson.
+    Parsing stays on the stdlib decoder: orjson reads integers wider than
+    64 bits as floats, which would corrupt large numeric nonces. Calls that
+    pass encoder options (sort_keys, default, ...) also use the stdlib path.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return _json_bytes(obj, sort_keys=self.sort_keys).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            _json_bytes(obj, sort_keys=self.sort_keys), mimetype=self.mimetype
+        )
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # ---------------- Configuration ----------------
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 VALID_SECRET = os.getenv("VALID_SECRET", "")
+# Parsed and encoded once at import; compared in constant time per secret
+_VALID_SECRETS = frozenset(
+    s.strip().encode("utf-8") for s in VALID_SECRET.split(",") if s.strip()
+)
 GITHUB_ACTOR = os.getenv("GITHUB_ACTOR")  # Optional
 EVAL_POST_MAX_TRIES = 6
+EVAL_POST_BASE_BACKOFF = 1.0  # seconds
+EVAL_POST_MAX_BACKOFF = 30.0  # seconds
+# Total retry budget; no new attempt is scheduled past this point
+EVAL_POST_DEADLINE = 120.0  # seconds
+# (connect, read): an unreachable evaluator fails fast instead of eating
+# the full read timeout on every attempt
+EVAL_POST_TIMEOUT = (3.05, 15)
+# Client errors that will not succeed on retry
+EVAL_POST_FATAL_STATUSES = (400, 401, 403, 404, 422)
+
+# Pooled session reused across evaluation callbacks; retries are handled
+# by post_evaluation_submission itself.
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=Retry(total=0)),
+)
+
+# Runs of dashes and characters GitHub does not keep in repo names
+_REPO_NAME_UNSAFE = re.compile(r"[^a-z0-9._]+")
+
+# Runs Pages enablement alongside the evaluation callback
+_PAGES_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+# How long the response waits for Pages once the callback is done
+PAGES_ENABLE_TIMEOUT = 60.0  # seconds
 
 
 # ---------------- Helper Functions ----------------
 def validate_secret(provided):
     """Check if provided secret is valid."""
-    valid = [s.strip() for s in VALID_SECRET.split(",") if s.strip()]
-    return provided in valid
+    if not provided or not isinstance(provided, str):
+        return False
+    provided_bytes = provided.encode("utf-8")
+    return any(hmac.compare_digest(provided_bytes, s) for s in _VALID_SECRETS)
 
 
 def safe_repo_name(task, email):
     """Generate a unique repo name."""
-    email_hash = hashlib.sha1(email.encode("utf-8")).hexdigest()[:8]
-    uid = uuid.uuid4().hex[:6]
-    base = task.replace(" ", "-").replace("/", "-").lower()
+    email_hash = hashlib.blake2b(email.encode("utf-8"), digest_size=4).hexdigest()
+    uid = secrets.token_hex(3)
+    base = _REPO_NAME_UNSAFE.sub("-", task.lower()).strip("-._") or "app"
     return f"{base}-{email_hash}-{uid}"
 
 
-def post_evaluation_submission(evaluation_url, payload):
-    """POSTs JSON to evaluation_url with exponential backoff."""
-    import requests
+def _retry_after_seconds(resp):
+    """Return the Retry-After delay in seconds, or None if absent/unparseable."""
+    value = resp.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
 
+
+def post_evaluation_submission(evaluation_url, payload):
+    """POSTs JSON to evaluation_url with capped, jittered exponential backoff."""
     headers = {"Content-Type": "application/json"}
-    wait = 1.0
-    tries = 0
-    while tries < EVAL_POST_MAX_TRIES:
+    # Serialise once; every retry resends the same bytes.
+    body = _json_bytes(payload)
+    deadline = time.monotonic() + EVAL_POST_DEADLINE
+    for attempt in range(EVAL_POST_MAX_TRIES):
+        wait = random.uniform(
+            0, min(EVAL_POST_MAX_BACKOFF, EVAL_POST_BASE_BACKOFF * 2**attempt)
+        )
         try:
-            resp = requests.post(
-                evaluation_url, headers=headers, json=payload, timeout=15
+            resp = _HTTP_SESSION.post(
+                evaluation_url, headers=headers, data=body, timeout=EVAL_POST_TIMEOUT
             )
+        except requests.RequestException:
+            pass
+        else:
             if resp.status_code == 200:
                 return
-        except Exception:
-            pass
-        tries += 1
+            if resp.status_code in EVAL_POST_FATAL_STATUSES:
+                raise RuntimeError(
+                    f"Evaluation submission rejected: status={resp.status_code}"
+                )
+            if resp.status_code in (429, 503):
+                retry_after = _retry_after_seconds(resp)
+                if retry_after is not None:
+                    wait = min(EVAL_POST_MAX_BACKOFF, retry_after)
+        if attempt + 1 >= EVAL_POST_MAX_TRIES:
+            break
+        if time.monotonic() + wait > deadline:
+            break
         time.sleep(wait)
-        wait *= 2
     raise RuntimeError("Failed to POST evaluation submission")
 
 
@@ -63,7 +165,8 @@ def post_evaluation_submission(evaluation_url, payload):
 def build_endpoint():
     try:
         payload = request.get_json(force=True)
-    except Exception:
+    except Exception as e:
+        app.logger.warning("Invalid JSON body: %s", e)
         return jsonify({"error": "Invalid JSON"}), 400
 
     # Required fields
@@ -89,19 +192,28 @@ def build_endpoint():
     files["LICENSE"] = make_mit_license(owner_for_license)
     files.setdefault(".gitignore", "node_modules/\n__pycache__/\n.env\n")
 
-    # Create GitHub repo and push files
+    # Create GitHub repo and push files in a single commit
     try:
-        gh_result = create_github_repo_and_push(
-            repo_name, files, GITHUB_TOKEN, owner_override=GITHUB_ACTOR
+        created = create_github_repo(
+            repo_name, GITHUB_TOKEN, owner_override=GITHUB_ACTOR
         )
-        repo_url = gh_result["repo_url"]
-        commit_sha = gh_result["commit_sha"]
-        owner = gh_result["owner"]
+        repo = created["repo"]
+        repo_url = created["repo_url"]
+        owner = created["owner"]
+        commit_sha = push_files_batch(repo, files)
 
-        # Enable GitHub Pages
-        enable_github_pages(owner, repo_name, GITHUB_TOKEN)
-        pages_url = f"https://{owner}.github.io/{repo_name}/"
+        # Enable GitHub Pages alongside the evaluation callback; the URL is
+        # deterministic, so the callback need not wait for it.
+        pages_url = github_pages_url(owner, repo_name)
+        pages_future = _PAGES_EXECUTOR.submit(
+            enable_github_pages,
+            owner,
+            repo_name,
+            GITHUB_TOKEN,
+            branch=repo.default_branch,
+        )
     except Exception as e:
+        app.logger.exception("Build failed for repo %s", repo_name)
         return jsonify({"error": str(e)}), 500
 
     # Prepare evaluation callback
@@ -116,16 +228,33 @@ def build_endpoint():
     }
 
     # POST to evaluation_url
+    error = None
     try:
         post_evaluation_submission(evaluation_url, eval_payload)
     except Exception as e:
+        app.logger.warning("Evaluation callback failed for %s: %s", repo_name, e)
+        error = str(e)
+
+    # Wait for Pages before responding: the serverless function may be
+    # frozen once the response is sent, and a failure belongs in it.
+    try:
+        pages_future.result(timeout=PAGES_ENABLE_TIMEOUT)
+    except FuturesTimeoutError:
+        app.logger.error("Timed out enabling GitHub Pages for %s", repo_name)
+        msg = f"Timed out after {PAGES_ENABLE_TIMEOUT:.0f}s enabling GitHub Pages"
+        error = f"{error}; {msg}" if error else msg
+    except Exception as e:
+        app.logger.error("Enabling GitHub Pages failed for %s: %s", repo_name, e)
+        error = f"{error}; {e}" if error else str(e)
+
+    if error is not None:
         return (
             jsonify(
                 {
                     "status": "partial",
                     "repo_url": repo_url,
                     "pages_url": pages_url,
-                    "error": str(e),
+                    "error": error,
                 }
             ),
             200,
@@ -153,7 +282,8 @@ def revise_endpoint():
     """
     try:
         payload = request.get_json(force=True)
-    except Exception:
+    except Exception as e:
+        app.logger.warning("Invalid JSON body: %s", e)
         return jsonify({"error": "Invalid JSON"}), 400
 
     # Required fields
@@ -179,5 +309,6 @@ def revise_endpoint():
 
 
 # ---------------- Main Entry ----------------
+# Development server only; see README "Self-Hosting" for production.
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=int(os.getenv("PORT", 5000)))
@@ -1,6 +1,52 @@
 import time
-from github import Github, GithubException
+from github import Auth, Github, GithubException, GithubRetry, InputGitTreeElement
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Longest single Retry-After sleep honoured on direct GitHub calls; matches
+# the evaluation callback's EVAL_POST_MAX_BACKOFF in build.py.
+GITHUB_RETRY_AFTER_MAX = 30.0  # seconds
+
+
+class _GitHubRetry(Retry):
+    """Retry that also honours Retry-After on GitHub's 403 secondary rate limits."""
+
+    # A 403 is only retried when it carries Retry-After; plain permission
+    # errors still fail immediately.
+    RETRY_AFTER_STATUS_CODES = Retry.RETRY_AFTER_STATUS_CODES | frozenset([403])
+
+    def parse_retry_after(self, retry_after):
+        # GitHub's secondary limits often ask for 60s or more; clamp so a
+        # single call cannot sleep for minutes.
+        return min(super().parse_retry_after(retry_after), GITHUB_RETRY_AFTER_MAX)
+
+
+# Retry policy for direct GitHub REST calls: back off with jitter on rate
+# limits and transient server errors, sleeping for Retry-After when sent.
+# At most 3 retries x GITHUB_RETRY_AFTER_MAX of sleep per call.
+GITHUB_RETRY = _GitHubRetry(
+    total=3,
+    backoff_factor=0.5,
+    backoff_jitter=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET", "HEAD", "PUT", "POST", "PATCH"]),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+# (connect, read) for the Pages API: an unreachable host fails fast instead
+# of eating the full read timeout on every attempt
+PAGES_API_TIMEOUT = (3.05, 20)
+
+# Shared pooled session so GitHub REST calls reuse keep-alive connections
+# instead of paying a TLS handshake per request.
+_GH_SESSION = requests.Session()
+_GH_SESSION.mount(
+    "https://",
+    HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=GITHUB_RETRY),
+)
 
 MIT_LICENSE_TEXT = """MIT License
 
@@ -10,57 +56,102 @@ Permission is hereby granted, free of charge, to any person obtaining a copy...
 (standard MIT body omitted for brevity)
 """
 
+# Year is filled in once per process; only the owner varies per call.
+_MIT_LICENSE_WITH_YEAR = MIT_LICENSE_TEXT.replace("{year}", time.strftime("%Y"))
+
 
 def make_mit_license(owner: str):
     """Returns MIT license text with year and owner."""
-    year = time.strftime("%Y")
-    owner_txt = owner or "Unknown"
-    return MIT_LICENSE_TEXT.format(year=year, owner=owner_txt)
+    return _MIT_LICENSE_WITH_YEAR.replace("{owner}", owner or "Unknown")
 
 
-def create_github_repo_and_push(
-    repo_name: str, files: dict, github_token: str, owner_override=None
-):
+def _github_client(github_token: str):
+    """
+    Returns a new Github client for one build.
+    PyGithub's Requester is not thread-safe, so clients are never shared
+    between concurrent requests.
+    """
+    # GithubRetry also handles GitHub's 403 secondary rate limit responses
+    return Github(
+        auth=Auth.Token(github_token),
+        retry=GithubRetry(total=5),
+        per_page=100,
+    )
+
+
+def create_github_repo(repo_name: str, github_token: str, owner_override=None):
     """
-    Create a public GitHub repo and push given files.
-    Returns repo_url, commit_sha, owner.
+    Create a public GitHub repo with an initial commit on its default branch.
+    Returns repo, repo_url, owner.
     """
-    g = Github(github_token)
+    g = _github_client(github_token)
     user = g.get_user()
     owner = owner_override or user.login
 
     try:
-        repo = user.create_repo(name=repo_name, private=False, auto_init=False)
+        # auto_init gives the repo a base commit; the Git Data API refuses
+        # to write to an empty repository.
+        repo = user.create_repo(name=repo_name, private=False, auto_init=True)
     except GithubException as e:
         raise RuntimeError(
             f"Failed to create repo: {e.data if hasattr(e, 'data') else str(e)}"
         )
 
-    last_sha = None
-    for path, content in files.items():
-        try:
-            repo.create_file(path, f"Add {path}", content, branch="main")
-            last_sha = repo.get_commits()[0].sha
-        except GithubException as ge:
-            raise RuntimeError(
-                f"Failed to create file {path}: {ge.data if hasattr(ge, 'data') else str(ge)}"
-            )
+    return {"repo": repo, "repo_url": repo.html_url, "owner": owner}
+
+
+def push_files_batch(repo, files: dict, message="Add app files"):
+    """
+    Push all files to the repo's default branch as a single commit using the
+    Git Data API (tree -> commit -> ref update).
+    Returns the new commit sha.
+    """
+    try:
+        ref = repo.get_git_ref(f"heads/{repo.default_branch}")
+        base_commit = repo.get_git_commit(ref.object.sha)
+
+        # Inline file content in the tree entries; GitHub creates the blobs
+        # server-side, so no per-file blob requests are needed.
+        elements = [
+            InputGitTreeElement(path, "100644", "blob", content=content)
+            for path, content in files.items()
+        ]
+        tree = repo.create_git_tree(elements, base_commit.tree)
+        commit = repo.create_git_commit(message, tree, [base_commit])
+        ref.edit(commit.sha)
+    except GithubException as ge:
+        raise RuntimeError(
+            f"Failed to push files: {ge.data if hasattr(ge, 'data') else str(ge)}"
+        )
+
+    return commit.sha
 
-    return {"repo_url": repo.html_url, "commit_sha": last_sha, "owner": owner}
+
+def github_pages_url(owner: str, repo_name: str):
+    """Returns the project Pages URL; its format is fixed by GitHub."""
+    return f"https://{owner}.github.io/{repo_name}/"
 
 
 def enable_github_pages(
     owner: str, repo_name: str, github_token: str, branch="main", path="/"
 ):
-    """Enable GitHub Pages for a repo using REST API."""
+    """
+    Enable GitHub Pages for a repo using REST API.
+    Returns the Pages URL without waiting for the first deployment.
+    """
     api_url = f"https://api.github.com/repos/{owner}/{repo_name}/pages"
     headers = {
         "Authorization": f"token {github_token}",
         "Accept": "application/vnd.github+json",
     }
     payload = {"source": {"branch": branch, "path": path}}
-    resp = requests.put(api_url, headers=headers, json=payload, timeout=20)
-    if resp.status_code not in (201, 204):
+    # POST creates the Pages site; PUT only updates an existing one.
+    # 409 means Pages is already enabled (e.g. a retried build), which is fine.
+    resp = _GH_SESSION.post(
+        api_url, headers=headers, json=payload, timeout=PAGES_API_TIMEOUT
+    )
+    if resp.status_code not in (201, 202, 204, 409):
         raise RuntimeError(
             f"Failed to enable Pages: status={resp.status_code} body={resp.text}"
         )
+    return github_pages_url(owner, repo_name)